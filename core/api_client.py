@@ -2,15 +2,255 @@
 API客户端模块，负责与大模型API通信
 """
 
+import asyncio
+import atexit
+import gzip
+import hashlib
 import json
+import os
 import re
+import shutil
+import tempfile
+import threading
+import weakref
 import requests
-from typing import Dict, Any, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+from urllib3.util.retry import Retry
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
 from core.character_limiter import normalize_text as limit_characters
+from core.utils import dumps_json, dumps_json_bytes, loads_json
+
+try:
+    import httpx  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+try:
+    import h2  # type: ignore  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    _HTTP2_AVAILABLE = False
+
+# 完整的思维链块（开闭标签须同名），或未闭合的思维链开头
+_THINK_ALL_RE = re.compile(
+    r'<(think(?:ing)?)>(?:(?!</\1>).)*</\1>'
+    r'|<think(?:ing)?>[^<]*(?:</think(?:ing)?>)?',
+    re.DOTALL | re.IGNORECASE
+)
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+_LEAD_NUM_RE = re.compile(r'^(?:\d+|\(\d+\)|\[\d+\])[\.\):]?\s*')
+_ARRAY_RE = re.compile(r'\[[\s\S]*\]')
+_THINK_CLOSE_RE = re.compile(r'</think(?:ing)?>', re.IGNORECASE)
+
+# 批量翻译结果缓存文件及容量
+CACHE_FILE = "translation_cache.json.gz"
+CACHE_CAPACITY = 4096
+STRING_CACHE_CAPACITY = 65536
+
+class _LoggingRetry(Retry):
+    """在每次重试前输出日志，便于观察限流退避情况"""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(
+            method=method, url=url, response=response, error=error, _pool=_pool, _stacktrace=_stacktrace
+        )
+        reason = str(error) if error is not None else f"状态码 {getattr(response, 'status', '?')}"
+        print(f"[api] 请求失败({reason})，第 {len(new_retry.history)} 次重试: {method} {url}")
+        return new_retry
+
+
+def _create_session() -> requests.Session:
+    """创建复用连接池的会话，避免每次请求重新握手"""
+    session = requests.Session()
+    retry = _LoggingRetry(
+        total=3,
+        connect=3,
+        # 读超时不重试：请求可能已被处理并计费，且180秒的超时会被成倍放大
+        read=False,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["POST", "GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# 进程内按 (主机, API Key摘要) 共享的会话，客户端重建或切换配置时仍可复用连接
+_SESSION_CACHE: Dict[Tuple[str, str], requests.Session] = {}
+_SESSION_LOCK = threading.Lock()
+
+
+def _get_session(api_url: str, api_key: str) -> requests.Session:
+    key = (
+        urlparse(api_url).netloc,
+        hashlib.blake2b(api_key.encode("utf-8"), digest_size=8).hexdigest()
+    )
+    with _SESSION_LOCK:
+        session = _SESSION_CACHE.get(key)
+        if session is None:
+            session = _SESSION_CACHE[key] = _create_session()
+        return session
+
+
+def _release_session(session: requests.Session):
+    with _SESSION_LOCK:
+        for key in [key for key, cached in _SESSION_CACHE.items() if cached is session]:
+            del _SESSION_CACHE[key]
+    session.close()
+
+
+@atexit.register
+def _close_sessions():
+    with _SESSION_LOCK:
+        sessions = list(_SESSION_CACHE.values())
+        _SESSION_CACHE.clear()
+    for session in sessions:
+        session.close()
+
+
+# 存活的客户端，退出时保存其翻译缓存（关闭窗口时后台线程可能来不及保存）
+_LIVE_CLIENTS: "weakref.WeakSet[APIClient]" = weakref.WeakSet()
+
+
+@atexit.register
+def _save_client_caches():
+    for client in list(_LIVE_CLIENTS):
+        client._save_cache()
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """从配置中解析出的只读请求参数，配置不变时各请求共用"""
+
+    __slots__ = (
+        "api_url", "api_key", "model_name", "system_prompt", "temperature",
+        "max_tokens", "headers", "system_msg", "model_list_headers", "model_endpoints"
+    )
+
+    api_url: str
+    api_key: str
+    model_name: str
+    system_prompt: str
+    temperature: float
+    max_tokens: int
+    headers: Dict[str, str]
+    system_msg: Dict[str, str]
+    model_list_headers: Dict[str, str]
+    model_endpoints: Tuple[str, ...]
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ConfigSnapshot":
+        api_url = config.get("api_url") or ""
+        api_key = config.get("api_key") or ""
+        system_prompt = (config.get("system_prompt") or "").strip()
+
+        try:
+            temperature = float(config.get("temperature", 1.0))
+        except (ValueError, TypeError):
+            temperature = 1.0
+
+        try:
+            max_tokens = int(config.get("max_tokens", 8192))
+            max_tokens = max(1, max_tokens)
+        except (ValueError, TypeError):
+            max_tokens = 8192
+
+        model_endpoints: Tuple[str, ...] = ()
+        if api_url:
+            chat_url = api_url
+            if not chat_url.endswith("/chat/completions"):
+                chat_url = chat_url.rstrip("/") + "/chat/completions"
+            base_url = "/".join(chat_url.split("/")[:3])
+            model_endpoints = (
+                f"{base_url}/models",
+                f"{base_url}/v1/models",
+                chat_url.replace("chat/completions", "models")
+            )
+
+        return cls(
+            api_url=api_url,
+            api_key=api_key,
+            model_name=config.get("model_name") or "",
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            },
+            system_msg={"role": "system", "content": system_prompt},
+            model_list_headers={
+                "Authorization": f"Bearer {api_key}",
+                "Accept": "application/json"
+            },
+            model_endpoints=model_endpoints
+        )
+
+
+class _StreamArrayParser:
+    """增量解析流式返回的JSON数组，每收到完整元素即返回"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = -1
+        self._decoder = json.JSONDecoder()
+
+    def _find_array_start(self) -> int:
+        buffer = self._buffer
+        offset = 0
+        think_index = buffer.lower().find("<think")
+        if think_index != -1 and think_index < buffer.find("["):
+            close_match = _THINK_CLOSE_RE.search(buffer, think_index)
+            if not close_match:
+                return -1
+            offset = close_match.end()
+        return buffer.find("[", offset)
+
+    def feed(self, chunk: str) -> List[Any]:
+        self._buffer += chunk
+        items: List[Any] = []
+        if self._pos < 0:
+            start = self._find_array_start()
+            if start < 0:
+                return items
+            self._pos = start + 1
+
+        buffer = self._buffer
+        length = len(buffer)
+        while True:
+            pos = self._pos
+            while pos < length and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= length or buffer[pos] == "]":
+                break
+            try:
+                item, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # 元素尚未接收完整
+            if not isinstance(item, (str, list, dict)) and (end >= length or buffer[end] not in ",] \t\r\n"):
+                break  # 数字等只有遇到分隔符才算结束，如"3."后可能还有小数部分
+            items.append(item)
+            self._pos = end
+        return items
+
 
 class APIClient:
     """API客户端类"""
 
+    __slots__ = (
+        "_config", "_snapshot", "_session", "_aclient", "_cache_lock",
+        "_exact_cache", "_string_cache", "_string_cache_scope", "_cache_dirty",
+        "__weakref__"
+    )
+
     def __init__(self, config: Dict[str, Any]):
         """
         初始化API客户端
@@ -19,97 +259,232 @@ class APIClient:
             config: 配置信息
         """
         self.config = config
+        self._aclient = None
+        self._cache_lock = threading.Lock()
+        self._exact_cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._string_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._string_cache_scope: Optional[List[str]] = None
+        self._cache_dirty = False
+        self._load_cache()
+        _LIVE_CLIENTS.add(self)
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self._config
+
+    @config.setter
+    def config(self, value: Dict[str, Any]):
+        self._config = value
+        self.reload_config()
+
+    def reload_config(self):
+        """丢弃根据配置预先构建的请求内容，配置变化后调用"""
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._session: Optional[requests.Session] = None
+
+    def _config_snapshot(self) -> ConfigSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = ConfigSnapshot.from_config(self.config)
+        return snapshot
+
+    def _http_session(self) -> requests.Session:
+        session = self._session
+        if session is None:
+            snapshot = self._config_snapshot()
+            session = self._session = _get_session(snapshot.api_url, snapshot.api_key)
+        return session
+
+    def close(self):
+        """保存翻译缓存并释放连接池中的连接"""
+        self._save_cache()
+        session = self._session
+        self._session = None
+        if session is not None:
+            _release_session(session)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def _log(self, message: str):
         print(f"[api] {message}")
 
+    @staticmethod
+    def _cache_key(model_name: str, system_prompt: str, texts: List[str]) -> str:
+        raw = model_name + system_prompt + dumps_json(texts)
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[List[str]]:
+        with self._cache_lock:
+            cached = self._exact_cache.get(key)
+            if cached is None:
+                return None
+            self._exact_cache.move_to_end(key)
+            return list(cached)
+
+    def _cache_put(self, key: str, translations: List[str]):
+        with self._cache_lock:
+            self._exact_cache[key] = list(translations)
+            self._exact_cache.move_to_end(key)
+            while len(self._exact_cache) > CACHE_CAPACITY:
+                self._exact_cache.popitem(last=False)
+            self._cache_dirty = True
+
+    def _string_cache_lookup(self, scope: List[str], texts: List[str]) -> Dict[str, str]:
+        """返回已缓存的单条译文；模型或系统提示变化时清空单条缓存"""
+        with self._cache_lock:
+            if self._string_cache_scope != scope:
+                self._string_cache.clear()
+                self._string_cache_scope = scope
+            cache = self._string_cache
+            found = {}
+            for text in texts:
+                translated = cache.get(text)
+                if translated is not None:
+                    cache.move_to_end(text)
+                    found[text] = translated
+            return found
+
+    def _string_cache_store(self, scope: List[str], entries: Dict[str, str]):
+        with self._cache_lock:
+            if self._string_cache_scope == scope:
+                cache = self._string_cache
+                for text, translated in entries.items():
+                    cache[text] = translated
+                    cache.move_to_end(text)
+                while len(cache) > STRING_CACHE_CAPACITY:
+                    cache.popitem(last=False)
+                self._cache_dirty = True
+
+    def _load_cache(self):
+        """从磁盘加载上次保存的翻译缓存"""
+        if not os.path.exists(CACHE_FILE):
+            return
+        try:
+            with gzip.open(CACHE_FILE, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._cache_lock:
+                for key, translations in data.get("batches", []):
+                    self._exact_cache[key] = translations
+                while len(self._exact_cache) > CACHE_CAPACITY:
+                    self._exact_cache.popitem(last=False)
+                self._string_cache_scope = data.get("scope")
+                self._string_cache.update(data.get("strings", {}))
+                while len(self._string_cache) > STRING_CACHE_CAPACITY:
+                    self._string_cache.popitem(last=False)
+            self._log(f"已加载翻译缓存 {len(self._exact_cache)} 批, {len(self._string_cache)} 条")
+        except Exception as e:
+            self._log(f"加载翻译缓存失败: {str(e)}")
+
+    def _save_cache(self):
+        """将翻译缓存保存到磁盘，便于下次启动时复用；自上次保存后无变化时跳过"""
+        with self._cache_lock:
+            if not self._cache_dirty:
+                return
+            self._cache_dirty = False
+            data = {
+                "batches": list(self._exact_cache.items()),
+                "scope": self._string_cache_scope,
+                "strings": dict(self._string_cache)
+            }
+        # 先写入同目录下的临时文件再替换，写入中断时不会损坏已有缓存
+        cache_dir = os.path.dirname(os.path.abspath(CACHE_FILE))
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=cache_dir, prefix=".translation_cache.", suffix=".tmp", delete=False) as raw:
+                tmp_path = raw.name
+                with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                    f.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+            # NamedTemporaryFile以0600创建，替换前沿用原文件权限
+            if os.path.exists(CACHE_FILE):
+                shutil.copymode(CACHE_FILE, tmp_path)
+            else:
+                os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, CACHE_FILE)
+            tmp_path = None
+        except Exception as e:
+            with self._cache_lock:
+                self._cache_dirty = True
+            self._log(f"保存翻译缓存失败: {str(e)}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
     def _build_common_payload(self):
-        api_url = self.config.get("api_url")
-        api_key = self.config.get("api_key")
-        model_name = self.config.get("model_name")
-        system_prompt = self.config.get("system_prompt")
+        snapshot = self._config_snapshot()
 
-        if not api_url or not api_key or not model_name:
+        if not snapshot.api_url or not snapshot.api_key or not snapshot.model_name:
             self._log("错误: API配置不完整，请检查API URL、API Key和模型名称")
             return None, {"success": False, "text": "翻译失败: API配置不完整"}
 
-        try:
-            temperature = float(self.config.get("temperature", 1.0))
-        except (ValueError, TypeError):
-            temperature = 1.0
-
-        try:
-            max_tokens = int(self.config.get("max_tokens", 8192))
-            max_tokens = max(1, max_tokens)
-        except (ValueError, TypeError):
-            max_tokens = 8192
-
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-
-        return {
-            "api_url": api_url,
-            "model_name": model_name,
-            "system_prompt": system_prompt,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "headers": headers
-        }, None
+        return snapshot, None
     
-    def translate_batch(self, texts: List[str], conversation_history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+    def _prepare_batch(self, texts: List[str], stream: bool = False):
+        """
+        构建批量翻译请求，缓存命中时直接给出结果
+
+        Returns:
+            (请求计划, 直接返回的结果)，二者其一为None
+        """
         if not texts:
-            return {"success": True, "translations": []}
+            return None, {"success": True, "translations": []}
 
         common, error = self._build_common_payload()
         if error:
-            return error
+            return None, error
 
         if not common:
-            return {"success": False, "text": "翻译失败: API配置不完整"}
+            return None, {"success": False, "text": "翻译失败: API配置不完整"}
 
-        api_url = common["api_url"]
-        model_name = common["model_name"]
-        system_prompt = (common.get("system_prompt") or "").strip()
-        temperature = common["temperature"]
-        max_tokens = common["max_tokens"]
-        headers = common["headers"]
+        model_name = common.model_name
+        system_msg = common.system_msg
+        system_prompt = system_msg["content"]
 
-        user_message = json.dumps(texts, ensure_ascii=False)
+        cache_key = self._cache_key(model_name, system_prompt, texts)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return None, {"success": True, "translations": cached}
 
-        messages = [
-            {
-                "role": "system",
-                "content": system_prompt
-            }
-        ]
+        scope = [model_name, system_prompt]
+        unique_texts = list(dict.fromkeys(texts))
+        known = self._string_cache_lookup(scope, unique_texts)
+        misses = [text for text in unique_texts if text not in known]
+        if not misses:
+            restored_translations = [known[text] for text in texts]
+            self._cache_put(cache_key, restored_translations)
+            return None, {"success": True, "translations": restored_translations}
 
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
+        messages = [system_msg, {"role": "user", "content": dumps_json(misses)}]
 
         data = {
             "model": model_name,
             "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens
+            "temperature": common.temperature,
+            "max_tokens": common.max_tokens
         }
+        if stream:
+            data["stream"] = True
         # print("批量请求消息体", messages)
-        # print(">>>>>>>>>>", sanitized_texts)
 
-        try:
-            response = requests.post(api_url, headers=headers, json=data, timeout=180)
-        except requests.exceptions.Timeout:
-            self._log("错误: 批量API请求超时")
-            return {"success": False, "text": "翻译失败: API请求超时"}
-        except requests.exceptions.ConnectionError:
-            self._log("错误: 无法连接到API服务器（批量请求）")
-            return {"success": False, "text": "翻译失败: 无法连接到API服务器"}
-        except Exception as e:
-            self._log(f"批量API请求发生错误: {str(e)}")
-            return {"success": False, "text": f"翻译失败: {str(e)}"}
+        return {
+            "api_url": common.api_url,
+            "headers": common.headers,
+            "body": dumps_json_bytes(data),
+            "texts": texts,
+            "cache_key": cache_key,
+            "scope": scope,
+            "known": known,
+            "misses": misses
+        }, None
 
+    def _finish_batch(self, plan: Dict[str, Any], response) -> Dict[str, Any]:
+        """解析批量翻译响应，写入缓存并按原顺序还原译文"""
         if response.status_code != 200:
             self._log(f"批量API请求失败，状态码: {response.status_code}")
             self._log(f"批量API错误响应: {response.text}")
@@ -117,30 +492,42 @@ class APIClient:
 
         response_data = {}
         try:
-            response_data = response.json()
+            response_data = loads_json(response.content)
             # self._log(f"批量API原始响应: {response.text}")
         except ValueError as e:
             self._log(f"批量API响应解析失败: {str(e)}")
             self._log(f"批量API响应文本: {response.text}")
             return {"success": False, "text": "翻译失败: 无法解析API响应"}
 
+        misses = plan["misses"]
+        known = plan["known"]
+
         try:
             raw_content = response_data["choices"][0]["message"]["content"]
             usage = response_data.get("usage", {})
 
-            translations = self._extract_batch_translations(raw_content, len(texts))
+            translations = self._extract_batch_translations(raw_content, len(misses))
             if not translations:
                 self._log(f"批量翻译解析失败: 无法提取翻译结果，批量翻译原始内容: {raw_content}")
                 return {"success": False, "text": "翻译失败: 无法解析批量翻译结果"}
             else:
                 self._log(f"批量翻译解析结果: {translations}")
 
-            restored_translations: List[str] = []
+            sanitize = self._sanitize_chat_response
+            seen: Dict[str, str] = {}
+            translated: Dict[str, str] = {}
+            for source_text, translated_text in zip(misses, translations):
+                limited = seen.get(translated_text)
+                if limited is None:
+                    limited = limit_characters(sanitize(translated_text, log_changes=False))
+                    seen[translated_text] = limited
+                translated[source_text] = limited
+
+            self._string_cache_store(plan["scope"], translated)
+            known.update(translated)
+            restored_translations = [known[text] for text in plan["texts"]]
 
-            for translated_text in translations:
-                cleaned = self._sanitize_chat_response(translated_text, log_changes=False)
-                limited = limit_characters(cleaned)
-                restored_translations.append(limited)
+            self._cache_put(plan["cache_key"], restored_translations)
 
             return {
                 "success": True,
@@ -153,16 +540,200 @@ class APIClient:
         except Exception as e:
             self._log(f"处理批量API响应时发生错误: {str(e)} \n 批量API响应数据：{response_data}")
             return {"success": False, "text": f"翻译失败: {str(e)}"}
+
+    def _post(self, url: str, **kwargs) -> requests.Response:
+        """发送POST请求；重试耗尽后被包装为ConnectionError的读超时仍按超时抛出"""
+        try:
+            return self._http_session().post(url, **kwargs)
+        except requests.exceptions.ConnectionError as e:
+            reason = e.args[0] if e.args else None
+            if isinstance(reason, MaxRetryError):
+                reason = reason.reason
+            if isinstance(reason, ReadTimeoutError):
+                raise requests.exceptions.ReadTimeout(e, request=e.request, response=e.response) from e
+            raise
+
+    def translate_batch(self, texts: List[str], conversation_history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        plan, result = self._prepare_batch(texts)
+        if result is not None:
+            return result
+
+        try:
+            response = self._post(plan["api_url"], headers=plan["headers"], data=plan["body"], timeout=180)
+        except requests.exceptions.Timeout:
+            self._log("错误: 批量API请求超时")
+            return {"success": False, "text": "翻译失败: API请求超时"}
+        except requests.exceptions.ConnectionError:
+            self._log("错误: 无法连接到API服务器（批量请求）")
+            return {"success": False, "text": "翻译失败: 无法连接到API服务器"}
+        except Exception as e:
+            self._log(f"批量API请求发生错误: {str(e)}")
+            return {"success": False, "text": f"翻译失败: {str(e)}"}
+
+        return self._finish_batch(plan, response)
+
+    def stream_batch(self, texts: List[str]) -> Iterator[str]:
+        """
+        流式批量翻译，按原顺序逐条产出译文
+
+        服务端不支持SSE时退回普通响应并一次性产出全部译文；
+        请求或解析失败时记录日志并提前结束，此时产出条数少于texts
+
+        Args:
+            texts: 待翻译文本列表
+        """
+        plan, result = self._prepare_batch(texts, stream=True)
+        if result is not None:
+            if result.get("success"):
+                yield from result["translations"]
+            return
+
+        try:
+            response = self._post(plan["api_url"], headers=plan["headers"], data=plan["body"], timeout=180, stream=True)
+        except requests.exceptions.Timeout:
+            self._log("错误: 流式API请求超时")
+            return
+        except requests.exceptions.ConnectionError:
+            self._log("错误: 无法连接到API服务器（流式请求）")
+            return
+        except Exception as e:
+            self._log(f"流式API请求发生错误: {str(e)}")
+            return
+
+        try:
+            content_type = response.headers.get("Content-Type", "")
+            if response.status_code != 200 or not content_type.startswith("text/event-stream"):
+                result = self._finish_batch(plan, response)
+                if result.get("success"):
+                    yield from result["translations"]
+                return
+
+            texts = plan["texts"]
+            misses = plan["misses"]
+            known = plan["known"]
+            translated: Dict[str, str] = {}
+            parser = _StreamArrayParser()
+            emitted = 0
+
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == b"[DONE]":
+                    break
+                try:
+                    chunk = loads_json(payload)
+                    delta = chunk["choices"][0].get("delta", {}).get("content")
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                    continue
+                if not delta:
+                    continue
+
+                for item in parser.feed(delta):
+                    if len(translated) >= len(misses):
+                        break
+                    cleaned = self._sanitize_chat_response(self._clean_translation_entry(item), log_changes=False)
+                    translated[misses[len(translated)]] = limit_characters(cleaned)
+
+                known.update(translated)
+                while emitted < len(texts) and texts[emitted] in known:
+                    yield known[texts[emitted]]
+                    emitted += 1
+
+            if len(translated) != len(misses):
+                self._log(f"流式翻译解析失败: 返回 {len(translated)} 条，期望 {len(misses)} 条")
+                return
+
+            self._string_cache_store(plan["scope"], translated)
+            self._cache_put(plan["cache_key"], [known[text] for text in texts])
+        except requests.exceptions.RequestException as e:
+            self._log(f"读取流式API响应时发生错误: {str(e)}")
+        finally:
+            response.close()
+
+    def _get_async_client(self):
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(
+                http2=_HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+                timeout=180
+            )
+        return self._aclient
+
+    async def aclose(self):
+        """关闭异步HTTP客户端"""
+        if self._aclient is not None:
+            client = self._aclient
+            self._aclient = None
+            await client.aclose()
+
+    async def translate_batch_async(self, texts: List[str], conversation_history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        异步批量翻译，未安装httpx时退回线程池执行同步请求
+
+        Args:
+            texts: 待翻译文本列表
+            conversation_history: 保留参数，与translate_batch一致
+
+        Returns:
+            与translate_batch相同格式的结果字典
+        """
+        if httpx is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.translate_batch, texts, conversation_history)
+
+        plan, result = self._prepare_batch(texts)
+        if result is not None:
+            return result
+
+        try:
+            response = await self._get_async_client().post(plan["api_url"], headers=plan["headers"], content=plan["body"])
+        except httpx.TimeoutException:
+            self._log("错误: 批量API请求超时")
+            return {"success": False, "text": "翻译失败: API请求超时"}
+        except httpx.TransportError:
+            self._log("错误: 无法连接到API服务器（批量请求）")
+            return {"success": False, "text": "翻译失败: 无法连接到API服务器"}
+        except Exception as e:
+            self._log(f"批量API请求发生错误: {str(e)}")
+            return {"success": False, "text": f"翻译失败: {str(e)}"}
+
+        return self._finish_batch(plan, response)
+
+    def translate_many(self, batches: List[List[str]], max_concurrent: int = 4) -> List[Dict[str, Any]]:
+        """
+        并发翻译多个批次
+
+        Args:
+            batches: 批次列表，每个批次为待翻译文本列表
+            max_concurrent: 同时进行的最大请求数
+
+        Returns:
+            与batches顺序一致的结果字典列表
+        """
+        return asyncio.run(self._translate_many(batches, max_concurrent))
+
+    async def _translate_many(self, batches: List[List[str]], max_concurrent: int) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(max(1, max_concurrent))
+
+        async def run(batch: List[str]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.translate_batch_async(batch)
+
+        try:
+            return list(await asyncio.gather(*(run(batch) for batch in batches)))
+        finally:
+            await self.aclose()
     
     def _sanitize_chat_response(self, content: str, log_changes: bool = True) -> str:
         if not content:
             return ""
 
         original_length = len(content)
-        cleaned = re.sub(r'<thinking>.*?</thinking>', '', content, flags=re.DOTALL | re.IGNORECASE)
-        cleaned = re.sub(r'<think>.*?</think>', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-        cleaned = re.sub(r'<think(?:ing)?>[^<]*(?:</think(?:ing)?>)?', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-        cleaned = re.sub(r'\n\s*\n', '\n\n', cleaned)
+        cleaned = content
+        if '<' in cleaned and '<think' in cleaned.lower():
+            cleaned = _THINK_ALL_RE.sub('', cleaned)
+        cleaned = _BLANK_LINES_RE.sub('\n\n', cleaned)
         cleaned = cleaned.strip()
 
         if log_changes and len(cleaned) != original_length:
@@ -181,30 +752,27 @@ class APIClient:
 
         cleaned = self._strip_code_fences(raw_content.strip())
 
-        parsed_array = None
         try:
-            parsed_json = json.loads(cleaned)
+            parsed_json = loads_json(cleaned)
         except json.JSONDecodeError:
             parsed_json = None
-
-        if isinstance(parsed_json, dict):
-            candidate = parsed_json.get("translations")
-            if isinstance(candidate, list):
-                parsed_array = candidate
-            elif isinstance(candidate, dict):
-                parsed_array = list(candidate.values())
-        elif isinstance(parsed_json, list):
-            parsed_array = parsed_json
-
-        if isinstance(parsed_array, list):
-            cleaned_results = [self._clean_translation_entry(item) for item in parsed_array]
-            if len(cleaned_results) == expected_count:
-                return cleaned_results
-
-        array_match = re.search(r'\[[\s\S]*\]', cleaned)
+        else:
+            if isinstance(parsed_json, list):
+                parsed_array = parsed_json
+            elif isinstance(parsed_json, dict):
+                parsed_array = parsed_json.get("translations")
+            else:
+                parsed_array = None
+            if isinstance(parsed_array, dict):
+                parsed_array = list(parsed_array.values())
+            if isinstance(parsed_array, list) and len(parsed_array) == expected_count:
+                return [self._clean_translation_entry(item) for item in parsed_array]
+
+        # 整体已是合法数组时，正则只会匹配到同一个数组，无需再扫描
+        array_match = None if isinstance(parsed_json, list) else _ARRAY_RE.search(cleaned)
         if array_match:
             try:
-                parsed_array = json.loads(array_match.group(0))
+                parsed_array = loads_json(array_match.group(0))
                 if isinstance(parsed_array, list):
                     cleaned_results = [self._clean_translation_entry(item) for item in parsed_array]
                     if len(cleaned_results) == expected_count:
@@ -222,28 +790,32 @@ class APIClient:
         if isinstance(item, str):
             text = item
         else:
-            text = json.dumps(item, ensure_ascii=False) if item is not None else ""
+            text = dumps_json(item) if item is not None else ""
 
         text = self._strip_code_fences(text.strip())
-        text = re.sub(r'^(?:\d+|\(\d+\)|\[\d+\])[\.\):]?\s*', '', text)
+        if text and (text[0].isdigit() or text[0] in "(["):
+            text = _LEAD_NUM_RE.sub('', text)
         return text
 
     def _strip_code_fences(self, content: str) -> str:
         if not content:
             return ""
 
+        if "```" not in content:
+            return content
+
         trimmed = content.strip()
-        if trimmed.startswith("```"):
-            newline_index = trimmed.find('\n')
-            if newline_index != -1:
-                trimmed = trimmed[newline_index + 1:]
+        if not trimmed.startswith("```"):
+            return content
 
-            if trimmed.endswith("```"):
-                trimmed = trimmed[:-3]
+        newline_index = trimmed.find('\n', 3)
+        if newline_index != -1:
+            trimmed = trimmed[newline_index + 1:]
 
-            return trimmed.strip()
+        if trimmed.endswith("```"):
+            trimmed = trimmed[:-3]
 
-        return content
+        return trimmed.strip()
 
     def test_connection(self) -> Dict[str, Any]:
         """
@@ -252,32 +824,19 @@ class APIClient:
         Returns:
             测试结果字典
         """
-        api_url = self.config.get("api_url")
-        api_key = self.config.get("api_key")
-        model_name = self.config.get("model_name")
+        snapshot = self._config_snapshot()
+        api_url = snapshot.api_url
+        model_name = snapshot.model_name
+        temperature = snapshot.temperature
+        max_tokens = snapshot.max_tokens
         
         if not api_url:
             return {"success": False, "message": "错误: API URL不能为空"}
-        if not api_key:
+        if not snapshot.api_key:
             return {"success": False, "message": "错误: API Key不能为空"}
         if not model_name:
             return {"success": False, "message": "错误: 模型名称不能为空"}
         
-        try:
-            temperature = float(self.config.get("temperature", 1.0))
-        except (ValueError, TypeError):
-            temperature = 1.0
-        
-        try:
-            max_tokens = int(self.config.get("max_tokens", 8192))
-        except (ValueError, TypeError):
-            max_tokens = 8192
-        
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
         messages = [
             {
                 "role": "system",
@@ -303,7 +862,7 @@ class APIClient:
         self._log("正在发送测试请求...")
         
         try:
-            response = requests.post(api_url, headers=headers, json=data, timeout=30)
+            response = self._post(api_url, headers=snapshot.headers, json=data, timeout=30)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -359,38 +918,22 @@ class APIClient:
         Returns:
             包含模型列表的字典
         """
-        api_url = self.config.get("api_url", "")
-        api_key = self.config.get("api_key", "")
+        snapshot = self._config_snapshot()
         
-        if not api_url:
+        if not snapshot.api_url:
             return {"success": False, "message": "获取模型列表失败: API URL不能为空"}
-        if not api_key:
+        if not snapshot.api_key:
             return {"success": False, "message": "获取模型列表失败: API Key不能为空"}
         
-        if not api_url.endswith("/chat/completions"):
-            api_url = api_url.rstrip("/") + "/chat/completions"
-        
-        base_url_parts = api_url.split("/")
-        base_url = "/".join(base_url_parts[:3])
-        
-        endpoints = [
-            f"{base_url}/models",
-            f"{base_url}/v1/models",
-            f"{api_url.replace('chat/completions', 'models')}"
-        ]
-        
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Accept": "application/json"
-        }
+        headers = snapshot.model_list_headers
         
         success = False
         models_list = []
         
-        for endpoint in endpoints:
+        for endpoint in snapshot.model_endpoints:
             try:
                 self._log(f"正在尝试API端点: {endpoint}")
-                response = requests.get(endpoint, headers=headers, timeout=15)
+                response = self._http_session().get(endpoint, headers=headers, timeout=15)
                 
                 if response.status_code == 200:
                     response_data = response.json()
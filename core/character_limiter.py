@@ -1,7 +1,8 @@
 import os
+import re
 import string
 from functools import lru_cache
-from typing import Dict, List
+from typing import Dict, List, Sequence, Tuple
 
 try:
     from pypinyin import lazy_pinyin, Style  # type: ignore
@@ -9,23 +10,41 @@ except ImportError:  # pragma: no cover - optional dependency
     lazy_pinyin = None
     Style = None
 
+# ASCII control characters outside string.printable
+_ASCII_CTL_RE = re.compile(r'[\x00-\x08\x0e-\x1f\x7f]')
+
+
+class _NormalizeTable(dict):
+    """str.translate使用的码位映射表，未见过的码位在首次查找时计算并缓存"""
+
+    def __init__(self, limiter: "CharacterLimiter"):
+        super().__init__()
+        self._limiter = limiter
+
+    def __missing__(self, codepoint: int) -> str:
+        replacement = self._limiter._normalize_char(chr(codepoint))
+        self[codepoint] = replacement
+        return replacement
+
 
 class CharacterLimiter:
     def __init__(self, allowed_chars_path: str):
         self.allowed_chars_path = allowed_chars_path
         self.allowed_chars = self._load_allowed_chars()
-        self.base_allowed = set(string.printable)  # ASCII characters are considered safe
-        self.base_allowed.update(self.allowed_chars)
+        # ASCII characters are considered safe; membership is tested on codepoints
+        self._allowed_cp = frozenset(map(ord, string.printable)) | frozenset(map(ord, self.allowed_chars))
+        self._table = _NormalizeTable(self)
         self._replacement_cache: Dict[str, str] = {}
-        self._pinyin_to_chars: Dict[str, List[str]] = {}
+        self._pinyin_keys_cache: Dict[str, Tuple[str, ...]] = {}
+        self._char_to_first_candidate: Dict[str, str] = {}
         if lazy_pinyin is not None and Style is not None:
             self._build_pinyin_index()
 
     def _load_allowed_chars(self) -> List[str]:
         try:
-            with open(self.allowed_chars_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                return [ch for ch in content if ch.strip()]
+            with open(self.allowed_chars_path, "rb") as f:
+                content = f.read().decode("utf-8")
+            return [ch for ch in content if not ch.isspace()]
         except Exception:
             return []
 
@@ -35,32 +54,42 @@ class CharacterLimiter:
             for key in py_keys:
                 if not key:
                     continue
-                self._pinyin_to_chars.setdefault(key, []).append(ch)
+                self._char_to_first_candidate.setdefault(key, ch)
 
-    def _generate_pinyin_keys(self, ch: str) -> List[str]:
-        keys: List[str] = []
+    def _generate_pinyin_keys(self, ch: str) -> Tuple[str, ...]:
+        cached = self._pinyin_keys_cache.get(ch)
+        if cached is not None:
+            return cached
         if lazy_pinyin is None or Style is None:
-            return keys
+            return ()
         try:
             tone_keys = lazy_pinyin(ch, style=Style.TONE3, neutral_tone_with_five=True)
             normal_keys = lazy_pinyin(ch, style=Style.NORMAL)
         except Exception:
-            return keys
+            return ()
+        keys: List[str] = []
         for seq in (tone_keys, normal_keys):
             if not seq:
                 continue
             key = seq[0]
             if key:
                 keys.append(key)
-        return list(dict.fromkeys(keys))  # preserve order, remove duplicates
+        result = tuple(dict.fromkeys(keys))  # preserve order, remove duplicates
+        self._pinyin_keys_cache[ch] = result
+        return result
 
     def normalize_text(self, text: str) -> str:
         if not text:
             return text
-        return "".join(self._normalize_char(ch) for ch in text)
+        if text.isascii() and not _ASCII_CTL_RE.search(text):
+            return text
+        if self._allowed_cp.issuperset(map(ord, text)):
+            return text
+        # 映射表在C层逐字符查找，只有首次出现的字符才会回到Python计算替换
+        return text.translate(self._table)
 
     def _normalize_char(self, ch: str) -> str:
-        if ch in self.base_allowed:
+        if ord(ch) in self._allowed_cp:
             return ch
         if ch.isspace():
             return " "
@@ -73,11 +102,10 @@ class CharacterLimiter:
     def _find_replacement(self, ch: str) -> str:
         if lazy_pinyin is None or Style is None:
             return ch
-        keys = self._generate_pinyin_keys(ch)
-        for key in keys:
-            candidates = self._pinyin_to_chars.get(key)
-            if candidates:
-                return candidates[0]
+        for key in self._generate_pinyin_keys(ch):
+            candidate = self._char_to_first_candidate.get(key)
+            if candidate:
+                return candidate
         return ch
 
 
@@ -85,6 +113,15 @@ _allowed_chars_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "
 character_limiter = CharacterLimiter(os.path.normpath(_allowed_chars_file))
 
 
-@lru_cache(maxsize=2048)
+@lru_cache(maxsize=16384)
 def normalize_text(text: str) -> str:
     return character_limiter.normalize_text(text)
+
+
+def normalize_texts(texts: Sequence[str]) -> List[str]:
+    """Normalize many strings at once; duplicates are processed only once and the LRU is bypassed."""
+    unique: Dict[str, str] = dict.fromkeys(texts)
+    normalize = character_limiter.normalize_text
+    for text in unique:
+        unique[text] = normalize(text)
+    return list(map(unique.__getitem__, texts))
@@ -25,13 +25,21 @@ class ConfigManager:
     def __init__(self, config_file: str = CONFIG_FILE):
         self.config_file = config_file
         self.config = DEFAULT_CONFIG.copy()
+        self._last_mtime = None
+        self._last_size = None
         
     def load_config(self):
         """加载配置"""
         try:
-            if not os.path.exists(self.config_file):
+            try:
+                st = os.stat(self.config_file)
+            except FileNotFoundError:
                 print("[config] 配置文件不存在，将使用默认配置")
                 return self.config
+
+            # 文件未变化时直接返回已解析的配置
+            if (st.st_mtime_ns, st.st_size) == (self._last_mtime, self._last_size):
+                return self.config
             
             config_parser = configparser.ConfigParser()
             config_parser.read(self.config_file, encoding='utf-8')
@@ -68,12 +76,16 @@ class ConfigManager:
                 except (ValueError, TypeError):
                     self.config["max_tokens"] = int(DEFAULT_CONFIG["max_tokens"])
                     
+                self._last_mtime = st.st_mtime_ns
+                self._last_size = st.st_size
                 print("[config] 配置已从文件加载")
             else:
                 print("[config] 配置文件中缺少API部分，将使用默认配置")
         except Exception as e:
             print(f"[config] 加载配置时出错: {str(e)}")
             self.config = DEFAULT_CONFIG.copy()
+            self._last_mtime = None
+            self._last_size = None
             
         return self.config
     
@@ -81,6 +93,8 @@ class ConfigManager:
         """保存配置"""
         try:
             self.config = config
+            self._last_mtime = None
+            self._last_size = None
             
             api_url = config["api_url"]
             if api_url.endswith("/chat/completions"):
@@ -3,81 +3,165 @@ HTTP服务器模块，提供翻译服务的HTTP接口
 """
 
 import http.server
+import itertools
+import os
 import socketserver
 import urllib.parse
-import queue
 import threading
-import time
 import concurrent.futures
-import socket
 import json
 import traceback
-from typing import Dict, Any, Callable, Optional, List
+from http import HTTPStatus
+from typing import Dict, Any, Callable, Optional, List, Tuple, Union
+
+from core.utils import PUNCTUATION_TABLE, dumps_json_bytes, loads_json
+
+# 设置环境变量 XUNITY_DEBUG=1 时输出完整的请求/响应详情
+_DEBUG = os.environ.get("XUNITY_DEBUG") == "1"
+
+# 请求编号：进程号前缀 + 自增计数（CPython下next()是原子操作）
+_REQ_PREFIX = f"req-{os.getpid()}-"
+_REQ_COUNTER = itertools.count(1)
+
+_JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+_PLAIN_CONTENT_TYPE = 'text/plain; charset=utf-8'
+
+
+def _build_header_template(protocol: str, status_code: int, content_type: str) -> bytes:
+    try:
+        reason = HTTPStatus(status_code).phrase
+    except ValueError:
+        reason = ""
+    return (
+        f"{protocol} {status_code} {reason}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        "Content-Length: %d\r\n"
+        "Connection: close\r\n"
+        "Server: XUnityLLM\r\n\r\n"
+    ).encode('latin-1')
+
+
+# 响应头模板（只差Content-Length），按(协议, 状态码, 类型)缓存
+_HEADER_TEMPLATES: Dict[Tuple[str, int, str], bytes] = {
+    (protocol, status_code, content_type): _build_header_template(protocol, status_code, content_type)
+    for protocol in (http.server.BaseHTTPRequestHandler.protocol_version,)
+    for status_code, content_type in (
+        (200, _JSON_CONTENT_TYPE),
+        (400, _PLAIN_CONTENT_TYPE),
+        (500, _PLAIN_CONTENT_TYPE),
+    )
+}
+
+
+def _to_str(item: Any) -> str:
+    if type(item) is str:
+        return item
+    return "" if item is None else str(item)
 
-from core.utils import convert_punctuation
 
 class TranslationHandler(http.server.BaseHTTPRequestHandler):
     """翻译请求处理类"""
     
+    # 执行翻译调用的线程池，其大小即并发翻译数上限
     executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
+    # 单个请求等待翻译结果的总时长上限（秒），包含排队与接口重试
+    translate_timeout = 180.0
+    # 关闭时完成该Future，唤醒所有等待中的请求
+    _shutdown_future = concurrent.futures.Future()
+    _shutdown_lock = threading.Lock()
+    # 已提交但尚未完成的任务
+    _inflight = set()
+    _inflight_lock = threading.Lock()
+
+    # 由ServerManager.start创建的子类绑定
+    config = None
+    app = None
+    api_client = None
 
     @staticmethod
-    def _safe_excerpt(text: str, limit: int = 200) -> str:
+    def _safe_excerpt(text: Union[str, bytes], limit: int = 200) -> str:
         if text is None:
             return ""
+        if isinstance(text, bytes):
+            text = text[:limit * 4].decode('utf-8', errors='replace')
         if len(text) <= limit:
             return text
         return f"{text[:limit]}...(truncated)"
 
     @staticmethod
     def _print_json(label: str, data: Any):
+        if not _DEBUG:
+            return
         try:
             serialized = json.dumps(data, ensure_ascii=False)
         except Exception:
             serialized = str(data)
         print(f"[server] {label}: {serialized}")
     
-    def __init__(self, *args, config=None, app=None, api_client=None, **kwargs):
-        self.config = config
-        self.app = app
-        self.api_client = api_client
-        self.result_queue = queue.Queue()
-        super().__init__(*args, **kwargs)
-    
+    @classmethod
+    def signal_shutdown(cls):
+        """通知所有等待中的请求立即结束"""
+        with cls._shutdown_lock:
+            if not cls._shutdown_future.done():
+                cls._shutdown_future.set_result(None)
+
+    @classmethod
+    def reset_shutdown(cls):
+        """服务器重新启动时清除关闭标记"""
+        with cls._shutdown_lock:
+            if cls._shutdown_future.done():
+                cls._shutdown_future = concurrent.futures.Future()
+
+    @classmethod
+    def get_executor(cls) -> concurrent.futures.ThreadPoolExecutor:
+        with cls._shutdown_lock:
+            # 关闭过程中不再新建线程池，调用方按RuntimeError处理
+            if cls._shutdown_future.done():
+                raise RuntimeError("线程池正在关闭")
+            if cls.executor is None:
+                cls.executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
+            return cls.executor
+
+    @classmethod
+    def submit(cls, fn, *args) -> concurrent.futures.Future:
+        """提交任务到线程池并跟踪其完成状态"""
+        future = cls.get_executor().submit(fn, *args)
+        with cls._inflight_lock:
+            cls._inflight.add(future)
+        future.add_done_callback(cls._discard_inflight)
+        return future
+
+    @classmethod
+    def _discard_inflight(cls, future: concurrent.futures.Future):
+        with cls._inflight_lock:
+            cls._inflight.discard(future)
+
     @classmethod
     def close_resources(cls):
         """关闭资源"""
-        if cls.executor:
+        with cls._shutdown_lock:
+            executor = cls.executor
+            cls.executor = None
+        if executor:
             try:
                 print("开始关闭线程池资源...")
-                cls.executor.shutdown(wait=False)
-
-                cls.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-
-                shutdown_success = False
-                try:
-                    executor_ref = cls.executor
-                    shutdown_thread = threading.Thread(
-                        target=lambda: executor_ref.shutdown(wait=True) if executor_ref else None,
-                        daemon=True
-                    )
-                    shutdown_thread.start()
-                    
-                    shutdown_thread.join(2.0)
-                    if not shutdown_thread.is_alive():
-                        shutdown_success = True
-                except Exception as e:
-                    print(f"等待线程池关闭时出错: {str(e)}")
-                
-                if not shutdown_success:
-                    print("线程池关闭超时，将强制关闭")
-                
-                cls.executor = None
+                with cls._inflight_lock:
+                    pending = list(cls._inflight)
+                if pending:
+                    _, not_done = concurrent.futures.wait(pending, timeout=2.0)
+                    if not_done:
+                        print(f"仍有 {len(not_done)} 个任务未完成，将取消尚未开始的任务")
+                        for future in not_done:
+                            future.cancel()
+                executor.shutdown(wait=False)
                 print("线程池资源已关闭")
             except Exception as e:
                 print(f"关闭线程池时出错: {str(e)}")
-                cls.executor = None
     
+    @classmethod
+    def _is_shutting_down(cls, app) -> bool:
+        return cls._shutdown_future.done() or (app is not None and getattr(app, 'is_shutting_down', False))
+
     def _log(self, message: str):
         print(f"[server] {message}")
 
@@ -85,18 +169,13 @@ class TranslationHandler(http.server.BaseHTTPRequestHandler):
         """屏蔽默认的HTTP请求日志"""
         pass
     
-    def update_conversation_history(self, user_text, ai_response):
-        """更新对话历史"""
-        if self.app:
-            self.app.update_conversation_history(user_text, ai_response)
-    
     def do_POST(self):
         """处理POST请求（批量翻译）"""
-        request_id = f"req-{int(time.time() * 1000)}-{threading.get_ident()}"
+        request_id = _REQ_PREFIX + str(next(_REQ_COUNTER))
         self.request_id = request_id
         try:
             content_length = int(self.headers.get('Content-Length', 0))
-            raw_body = self.rfile.read(content_length).decode('utf-8') if content_length > 0 else ''
+            raw_body = self.rfile.read(content_length) if content_length > 0 else b''
 
             # self._log(f"[{request_id}] 收到批量翻译POST请求，正文长度 {content_length} 字节")
 
@@ -106,7 +185,7 @@ class TranslationHandler(http.server.BaseHTTPRequestHandler):
                 return
 
             try:
-                payload = json.loads(raw_body)
+                payload = loads_json(raw_body)
             except json.JSONDecodeError:
                 self._write_plain_response(400, "请求体不是有效的JSON")
                 excerpt = self._safe_excerpt(raw_body)
@@ -122,11 +201,17 @@ class TranslationHandler(http.server.BaseHTTPRequestHandler):
                 self._print_json(f"[{request_id}] 无效payload", payload)
                 return
 
-            normalized_texts = [str(item) if item is not None else "" for item in texts]
+            normalized_texts = list(map(_to_str, texts))
             print(f"[{request_id}] 接收到批量翻译请求，共 {len(normalized_texts)} 条")
 
-            self._submit_translation(normalized_texts)
-            result = self._wait_for_result()
+            # 空白条目无需翻译，原样保留在对应位置
+            nonempty_idx = [i for i, text in enumerate(normalized_texts) if text.strip()]
+            if not nonempty_idx:
+                result = {"success": True, "translations": [], "usage": None}
+            elif len(nonempty_idx) == len(normalized_texts):
+                result = self._process_translation_request(normalized_texts)
+            else:
+                result = self._process_translation_request([normalized_texts[i] for i in nonempty_idx])
 
             if not result.get("success"):
                 error_message = result.get("error", "翻译失败")
@@ -136,6 +221,11 @@ class TranslationHandler(http.server.BaseHTTPRequestHandler):
                 return
 
             translations = result.get("translations", [])
+            if len(nonempty_idx) != len(normalized_texts):
+                merged = normalized_texts[:]
+                for index, translated in zip(nonempty_idx, translations):
+                    merged[index] = translated
+                translations = merged
             usage = result.get("usage")
 
             response_payload: Dict[str, Any] = {
@@ -153,111 +243,109 @@ class TranslationHandler(http.server.BaseHTTPRequestHandler):
             self._log(traceback.format_exc())
             self._write_plain_response(500, f"服务器错误: {str(e)}")
     
-    def _process_translation_request(self, payload):
-        """处理翻译请求"""
+    def _process_translation_request(self, payload) -> Dict[str, Any]:
+        """处理翻译请求，返回结果字典；接口调用在线程池中执行并受总时长限制"""
+        request_id = getattr(self, "request_id", "req-unknown")
+        app = self.app
+        api_client = self.api_client
+        shutdown_future = TranslationHandler._shutdown_future
         try:
-            request_id = getattr(self, "request_id", "req-unknown")
-            if self.app and getattr(self.app, 'is_shutting_down', False):
+            if self._is_shutting_down(app):
                 self._log(f"[{request_id}] 应用程序正在关闭，取消翻译请求")
-                self.result_queue.put({"success": False, "error": "翻译失败: 应用程序正在关闭"})
-                return
+                return {"success": False, "error": "翻译失败: 应用程序正在关闭"}
 
-            if not self.api_client:
+            if not api_client:
                 self._log(f"[{request_id}] 错误: API客户端未初始化")
-                self.result_queue.put({"success": False, "error": "翻译失败: API客户端未初始化"})
-                return
+                return {"success": False, "error": "翻译失败: API客户端未初始化"}
+
+            # do_POST传入的列表已规范化为list[str]，只对单个文本做兜底转换
+            texts_to_translate = payload if isinstance(payload, list) else [_to_str(payload)]
 
-            texts_to_translate = payload if isinstance(payload, list) else [payload]
-            texts_to_translate = [str(item) if item is not None else "" for item in texts_to_translate]
+            try:
+                future = TranslationHandler.submit(api_client.translate_batch, texts_to_translate, None)
+            except RuntimeError:
+                # 线程池已关闭
+                self._log(f"[{request_id}] 应用程序正在关闭，取消翻译请求")
+                return {"success": False, "error": "翻译失败: 应用程序正在关闭"}
 
-            result = self.api_client.translate_batch(texts_to_translate, None)
+            done, _ = concurrent.futures.wait(
+                (future, shutdown_future),
+                timeout=self.translate_timeout,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            if future not in done:
+                future.cancel()
+                if shutdown_future in done:
+                    self._log(f"[{request_id}] 应用程序正在关闭，中断等待翻译结果")
+                    return {"success": False, "error": "翻译失败: 应用程序正在关闭"}
+                self._log(f"[{request_id}] 错误: 翻译处理超时")
+                return {"success": False, "error": "翻译失败: 处理超时"}
+            if future.cancelled():
+                # 关闭线程池时被取消
+                self._log(f"[{request_id}] 应用程序正在关闭，取消翻译请求")
+                return {"success": False, "error": "翻译失败: 应用程序正在关闭"}
+
+            result = future.result()
             # self._print_json(f"[{request_id}] 翻译响应", result)
 
             if not result.get("success"):
                 error_message = result.get("text") or result.get("error") or "翻译失败"
                 self._log(f"[{request_id}] 翻译接口返回失败: {error_message}")
                 self._print_json(f"[{request_id}] 失败响应详情", result)
-                self.result_queue.put({"success": False, "error": error_message})
-                return
+                return {"success": False, "error": error_message}
 
             translations = result.get("translations", [])
             if len(translations) != len(texts_to_translate):
                 self._log(
                     f"[{request_id}] 翻译失败: 返回数量 {len(translations)} 与请求数量 {len(texts_to_translate)} 不匹配"
                 )
-                self.result_queue.put({"success": False, "error": "翻译失败: 返回数量与请求数量不匹配"})
-                return
+                return {"success": False, "error": "翻译失败: 返回数量与请求数量不匹配"}
 
-            translations = [convert_punctuation(item) for item in translations]
+            translations = [item.translate(PUNCTUATION_TABLE) for item in translations]
 
             usage = result.get("usage")
-            if usage and self.app:
+            if usage and app:
                 prompt_tokens = usage.get('prompt_tokens', 0)
                 completion_tokens = usage.get('completion_tokens', 0)
                 total_tokens = usage.get('total_tokens', 0)
-                self.app.update_token_count(prompt_tokens, completion_tokens, total_tokens)
+                app.update_token_count(prompt_tokens, completion_tokens, total_tokens)
 
-            if self.app:
+            if app:
+                update_history = app.update_conversation_history
                 for original, translated in zip(texts_to_translate, translations):
-                    self.update_conversation_history(original, translated)
+                    update_history(original, translated)
 
-            if self.app and getattr(self.app, 'is_shutting_down', False):
+            if self._is_shutting_down(app):
                 self._log(f"[{request_id}] 应用程序正在关闭，放弃返回翻译结果")
-                return
+                return {"success": False, "error": "翻译失败: 应用程序正在关闭"}
 
             # self._log(f"[{request_id}] 批量翻译完成: {len(translations)} 条")
 
-            self.result_queue.put({
+            return {
                 "success": True,
                 "translations": translations,
                 "usage": usage
-            })
+            }
         except Exception as e:
             error_message = f"翻译失败: {str(e)}"
-            request_id = getattr(self, "request_id", "req-unknown")
             self._log(f"[{request_id}] 翻译处理异常: {str(e)}")
             self._log(traceback.format_exc())
-            if not (self.app and getattr(self.app, 'is_shutting_down', False)):
-                self.result_queue.put({"success": False, "error": error_message})
-
-    def _submit_translation(self, payload):
-        if TranslationHandler.executor is None:
-            TranslationHandler.executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
+            return {"success": False, "error": error_message}
 
-        TranslationHandler.executor.submit(self._process_translation_request, payload)
-
-    def _wait_for_result(self, timeout: float = 180.0) -> Dict[str, Any]:
-        start_time = time.time()
-        request_id = getattr(self, "request_id", "req-unknown")
-
-        while time.time() - start_time < timeout:
-            if self.app and getattr(self.app, 'is_shutting_down', False):
-                self._log(f"[{request_id}] 应用程序正在关闭，中断等待翻译结果")
-                return {"success": False, "error": "翻译失败: 应用程序正在关闭"}
-
-            try:
-                return self.result_queue.get(timeout=0.5)
-            except queue.Empty:
-                continue
-
-        self._log(f"[{request_id}] 错误: 翻译处理超时")
-        return {"success": False, "error": "翻译失败: 处理超时"}
+    def _write_response(self, status_code: int, content_type: str, body: bytes):
+        """状态行、头部与正文拼接后一次写出"""
+        key = (self.protocol_version, status_code, content_type)
+        template = _HEADER_TEMPLATES.get(key)
+        if template is None:
+            template = _HEADER_TEMPLATES[key] = _build_header_template(*key)
+        self.close_connection = True
+        self.wfile.write(template % len(body) + body)
 
     def _write_plain_response(self, status_code: int, message: str):
-        payload = (message or "").encode('utf-8')
-        self.send_response(status_code)
-        self.send_header('Content-type', 'text/plain; charset=utf-8')
-        self.send_header('Content-Length', str(len(payload)))
-        self.end_headers()
-        self.wfile.write(payload)
+        self._write_response(status_code, _PLAIN_CONTENT_TYPE, (message or "").encode('utf-8'))
 
     def _write_json_response(self, status_code: int, payload: Dict[str, Any]):
-        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
-        self.send_response(status_code)
-        self.send_header('Content-type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
+        self._write_response(status_code, _JSON_CONTENT_TYPE, dumps_json_bytes(payload))
 
 
 class ThreadedHTTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
@@ -296,19 +384,6 @@ class ServerManager:
     def _log(self, message: str):
         print(f"[server] {message}")
     
-    def is_port_available(self, port: int) -> bool:
-        """检查端口是否可用"""
-        test_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        try:
-            test_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            test_socket.settimeout(1)
-            test_socket.bind(('', port))
-            return True
-        except socket.error:
-            return False
-        finally:
-            test_socket.close()
-    
     def start(self) -> bool:
         """启动服务器"""
         if self.is_running:
@@ -324,20 +399,18 @@ class ServerManager:
                 self._log(f"端口号无效: {str(e)}")
                 return False
             
-            if not self.is_port_available(port):
-                self._log(f"端口 {port} 已被占用，请尝试其他端口")
-                return False
-            
-            def handler_factory(*args, **kwargs):
-                return TranslationHandler(
-                    *args, 
-                    config=self.config, 
-                    app=self.app,
-                    api_client=self.api_client,
-                    **kwargs
-                )
+            handler_class = type("BoundTranslationHandler", (TranslationHandler,), {
+                "config": self.config,
+                "app": self.app,
+                "api_client": self.api_client
+            })
             
-            self.server = ThreadedHTTPServer(("", port), handler_factory)
+            TranslationHandler.reset_shutdown()
+            try:
+                self.server = ThreadedHTTPServer(("", port), handler_class)
+            except OSError as e:
+                self._log(f"端口 {port} 已被占用，请尝试其他端口: {str(e)}")
+                return False
             self.server_thread = threading.Thread(target=self.server.serve_forever)
             self.server_thread.daemon = True
             self.server_thread.start()
@@ -360,14 +433,17 @@ class ServerManager:
         try:
             self._log("正在取消所有待处理的请求...")
             
-            TranslationHandler.close_resources()
+            TranslationHandler.signal_shutdown()
 
             self._log("正在关闭服务器...")
 
+            # 先停止接受新连接，再等待并关闭线程池
             if self.server:
                 self.server.shutdown()
                 self.server.server_close()
 
+            TranslationHandler.close_resources()
+
             if self.server_thread:
                 self.server_thread.join(timeout=5.0)
 
@@ -2,13 +2,24 @@
 工具函数模块，包含一些通用的工具函数
 """
 
+import json
+from typing import Any, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
 # 中文标点符号转英文标点符号映射
 PUNCTUATION_MAPPING = {
     '，': ',', '。': '.', '！': '!', '？': '?', '；': ';', '：': ':',
-    '"': '"', '"': '"', ''': "'", ''': "'", '【': '[', '】': ']',
+    '\u201c': '"', '\u201d': '"', '\u2018': "'", '\u2019': "'", '【': '[', '】': ']',
     '（': '(', '）': ')', '《': '<', '》': '>', '、': ',', '～': '~'
 }
 
+# 供str.translate使用的码位映射表
+PUNCTUATION_TABLE = str.maketrans(PUNCTUATION_MAPPING)
+
 def convert_punctuation(text: str) -> str:
     """
     转换中文标点为英文标点
@@ -16,7 +27,31 @@ def convert_punctuation(text: str) -> str:
     if not text:
         return ""
     
-    for cn_punct, en_punct in PUNCTUATION_MAPPING.items():
-        text = text.replace(cn_punct, en_punct)
-    
-    return text 
\ No newline at end of file
+    return text.translate(PUNCTUATION_TABLE)
+
+
+def dumps_json_bytes(data: Any) -> bytes:
+    """
+    序列化为UTF-8编码的紧凑JSON，优先使用orjson
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_json(data: Any) -> str:
+    """
+    序列化为紧凑JSON字符串，非ASCII字符不转义
+    """
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads_json(data: Union[str, bytes]) -> Any:
+    """
+    解析JSON，解析失败时抛出json.JSONDecodeError（orjson的异常同为其子类）
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
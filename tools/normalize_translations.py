@@ -1,5 +1,7 @@
 import os
+import re
 import sys
+from typing import List, Optional, Tuple
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.normpath(os.path.join(CURRENT_DIR, '..'))
@@ -7,26 +9,18 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from core.character_limiter import normalize_text as limit_characters
+from core.character_limiter import normalize_texts as limit_characters_batch
+
+# 第一个未被反斜杠转义的'='
+_SPLIT_RE = re.compile(r'(?<!\\)=')
 
 
 def find_split_index(line: str) -> int:
-    idx = 0
-    length = len(line)
-    while idx < length:
-        pos = line.find('=', idx)
-        if pos == -1:
-            return -1
-        if pos > 0 and line[pos - 1] == '\\':
-            idx = pos + 1
-            continue
-        return pos
-    return -1
+    match = _SPLIT_RE.search(line)
+    return match.start() if match else -1
 
 
-def process_line(line: str) -> str:
-    if not line:
-        return line
-
+def split_line(line: str) -> Tuple[str, Optional[str], str]:
     newline = ''
     if line.endswith('\r\n'):
         newline = '\r\n'
@@ -37,22 +31,39 @@ def process_line(line: str) -> str:
 
     split_idx = find_split_index(line)
     if split_idx == -1:
-        return line + newline
+        return line, None, newline
+
+    return line[:split_idx + 1], line[split_idx + 1:], newline
+
+
+def process_line(line: str) -> str:
+    if not line:
+        return line
+
+    head, value, newline = split_line(line)
+    if value is None:
+        return head + newline
+    return head + limit_characters(value) + newline
+
 
-    key = line[:split_idx]
-    value = line[split_idx + 1:]
-    limited = limit_characters(value)
-    return key + '=' + limited + newline
+def process_lines_bulk(lines: List[str]) -> List[str]:
+    parts = [split_line(line) for line in lines]
+    limited = iter(limit_characters_batch([value for _, value, _ in parts if value is not None]))
+    return [
+        head + newline if value is None else head + next(limited) + newline
+        for head, value, newline in parts
+    ]
 
 
 def process_file(path: str) -> None:
     with open(path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+        data = f.read()
 
-    processed = [process_line(line) for line in lines]
+    # 文本模式下换行已统一为'\n'；不用splitlines，避免在\u2028等字符处误拆行
+    processed = process_lines_bulk(data.split('\n'))
 
     with open(path, 'w', encoding='utf-8') as f:
-        f.writelines(processed)
+        f.write('\n'.join(processed))
 
 
 if __name__ == '__main__':
@@ -1,42 +1,48 @@
 """移除机翻文件中未实际翻译的条目"""
 
 import argparse
+import os
+import shutil
+import tempfile
 from pathlib import Path
 from typing import Tuple
 
 
 def _line_is_untranslated(line: str) -> bool:
-    equals_index = line.find("=")
-    if equals_index == -1:
-        return False
-
-    source = line[:equals_index].strip()
-    target = line[equals_index + 1 :].strip()
-    if source == "" or source != target:
+    source, separator, target = line.partition("=")
+    if not separator:
         return False
 
+    source = source.strip()
+    # 过短的条目(含空键)保留，无需再处理右侧
     if len(source) <= 3:
         return False
 
-    return True
+    return source == target.strip()
 
 
 def _process_file(path: Path) -> Tuple[int, int]:
-    with path.open("r", encoding="utf-8-sig") as handler:
-        lines = handler.readlines()
-
-    kept_lines = []
+    total = 0
     removed = 0
-    for line in lines:
-        if _line_is_untranslated(line):
-            removed += 1
-            continue
-        kept_lines.append(line)
-
-    with path.open("w", encoding="utf-8-sig", newline="") as handler:
-        handler.writelines(kept_lines)
-
-    return len(lines), removed
+    with path.open("r", encoding="utf-8-sig") as src, tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, delete=False, encoding="utf-8-sig", newline="", suffix=".tmp"
+    ) as dst:
+        try:
+            for line in src:
+                total += 1
+                if _line_is_untranslated(line):
+                    removed += 1
+                    continue
+                dst.write(line)
+        except BaseException:
+            dst.close()
+            os.unlink(dst.name)
+            raise
+
+    # 临时文件以0600创建，替换前沿用原文件权限
+    shutil.copymode(path, dst.name)
+    os.replace(dst.name, path)
+    return total, removed
 
 
 def main() -> None:
@@ -257,6 +257,7 @@ class TranslationServiceApp:
     def on_close(self):
         """窗口关闭事件处理"""
         self.is_shutting_down = True
+        TranslationHandler.signal_shutdown()
         
         self._log("正在关闭应用程序，请稍候...")
         close_start_time = time.time()
@@ -286,7 +287,12 @@ class TranslationServiceApp:
                 print("线程资源已清理完毕")
             except Exception as e:
                 print(f"清理线程资源时出错: {str(e)}")
-            
+
+            try:
+                self.api_client.close()
+            except Exception as e:
+                print(f"关闭API连接池时出错: {str(e)}")
+
             print("后台关闭操作完成")
         except Exception as e:
             print(f"后台关闭操作出错: {str(e)}")